@@ -1,8 +1,9 @@
 from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import select, Session
-from typing import List
+from typing import Iterator, List, Tuple
+import re
 from markdown import markdown
 from database import create_db_and_tables, get_session, engine
 from schemas import ArticleCreate, ArticleRead, ArticleUpdate, Article
@@ -51,19 +52,111 @@ def read_article(*, article_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Article not found")
     return article
 
+# 按标题把文章拆分成多个小节，超过这个级别的标题（如###）留在所在小节内部
+SECTION_LEVEL = 2
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(`{3,}|~{3,})")
+# 引用式链接和脚注的定义，例如 [1]: https://example.com 或 [^note]: 说明
+DEFINITION_PATTERN = re.compile(r"^ {0,3}\[[^\]]+\]:\s*\S")
+
+def mark_fences(lines: List[str]) -> Iterator[Tuple[str, bool]]:
+    # 逐行返回(行, 是否在代码块内)，代码块只能由和开头相同字符、长度不小于开头的标记结束
+    opening = None
+    for line in lines:
+        match = FENCE_PATTERN.match(line)
+        if opening is None:
+            if match:
+                opening = match.group(1)
+            yield line, opening is not None
+        else:
+            if match and match.group(1)[0] == opening[0] and len(match.group(1)) >= len(opening) and not line.strip().strip(opening[0]):
+                opening = None
+            yield line, True
+
+def slugify(text: str) -> str:
+    # 把标题转换成锚点，保留中文、字母和数字，其他字符换成-
+    slug = re.sub(r"[^\w]+", "-", text.strip().lower()).strip("-")
+    return slug or "section"
+
+def split_sections(content: str) -> List[Tuple[str, str, str]]:
+    # 在标题处拆分markdown，返回(锚点, 标题, markdown内容)列表，代码块里的#不算标题
+    sections = []
+    anchor, title, lines = "top", "", []
+    used = set()
+    for line, in_fence in mark_fences(content.split("\n")):
+        match = None if in_fence else HEADING_PATTERN.match(line)
+        if match and len(match.group(1)) <= SECTION_LEVEL:
+            if lines:
+                sections.append((anchor, title, "\n".join(lines)))
+                used.add(anchor)  # 开头没有标题的部分占用了top，后面的标题不能再用
+            title = match.group(2)
+            anchor = slugify(title)
+            # 标题重复时在锚点后面加序号
+            base, index = anchor, 1
+            while anchor in used:
+                anchor = f"{base}-{index}"
+                index += 1
+            used.add(anchor)
+            lines = []
+        lines.append(line)
+    if lines:
+        sections.append((anchor, title, "\n".join(lines)))
+    return sections
+
+def collect_definitions(content: str) -> str:
+    # 收集整篇文章的引用式链接和脚注定义，分节渲染时附加到每个小节后面，跨小节的引用才能正常解析
+    definitions = []
+    in_definition = False
+    for line, in_fence in mark_fences(content.split("\n")):
+        if not in_fence and DEFINITION_PATTERN.match(line):
+            definitions.append(line)
+            in_definition = True
+        elif in_definition and not in_fence and line.startswith(("    ", "\t")):  # 脚注定义的续行
+            definitions.append(line)
+        else:
+            in_definition = False
+    return "\n".join(definitions)
+
+def render_section(anchor: str, section_content: str, definitions: str = "") -> str:
+    # 把一个小节渲染成html片段
+    html = markdown(section_content + "\n\n" + definitions)
+    return f'<section id="{anchor}">\n{html}\n</section>\n'
+
+def get_article_or_404(session: Session, article_id: int) -> Article:
+    article = session.get(Article, article_id)
+    if not article:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Article not found")
+    return article
+
 # 获取文章 html 内容接口
 # @app.get("/articles/{article_id}/html", response_model=dict)
 @app.get("/articles/{article_id}/html", response_class=HTMLResponse)
 def read_article_html(*, article_id: int, session: Session = Depends(get_session)):
-    article = session.get(Article, article_id)
-    if not article:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Article not found")
+    article = get_article_or_404(session, article_id)
     
-    # 使用 markdown 库将 markdown 内容转换为 html
-    print('======================',article.content,'=============================')
-    html_content = markdown(article.content)
-    # return {"id": article.id, "title": article.title, "html": html_content}
-    return HTMLResponse(content=html_content)       
+    # 按小节渲染并逐个发送，客户端收到第一个小节就可以先显示，不用等整篇文章渲染完
+    sections = split_sections(article.content)
+    definitions = collect_definitions(article.content)
+    def render() -> Iterator[str]:
+        for anchor, _, section_content in sections:
+            yield render_section(anchor, section_content, definitions)
+    return StreamingResponse(render(), media_type="text/html")
+
+# 获取文章小节目录接口，客户端可以根据目录按需加载小节
+@app.get("/articles/{article_id}/sections")
+def read_article_sections(*, article_id: int, session: Session = Depends(get_session)):
+    article = get_article_or_404(session, article_id)
+    return [{"anchor": anchor, "title": title} for anchor, title, _ in split_sections(article.content)]
+
+# 根据锚点获取单个小节的 html 内容接口
+@app.get("/articles/{article_id}/html/{anchor}", response_class=HTMLResponse)
+def read_article_section_html(*, article_id: int, anchor: str, session: Session = Depends(get_session)):
+    article = get_article_or_404(session, article_id)
+    for section_anchor, _, section_content in split_sections(article.content):
+        if section_anchor == anchor:
+            return HTMLResponse(content=render_section(section_anchor, section_content, collect_definitions(article.content)))
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Section not found")
+
 # 更新文章接口
 @app.put("/articles/{article_id}", response_model=ArticleRead)
 def update_article(*,
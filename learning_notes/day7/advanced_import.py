@@ -1,8 +1,11 @@
 import argparse
+import os
+from pathlib import Path
 from datetime import datetime
-from sqlmodel import Session
-from database import engine, create_db_and_tables
-from models.article import Article
+from database import open_session, create_db_and_tables
+from schemas.article import ArticleCreate
+from utils.asset_store import collect_assets
+from crud.article import create_article, delete_article, get_articles, sync_related_index
 
 def import_articles(file_path: str, clear_existing: bool = False):
     """导入文章的通用函数"""
@@ -13,6 +16,12 @@ def import_articles(file_path: str, clear_existing: bool = False):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
+    # 收集文章引用的本地图片和附件，保存到资源目录，并把引用改成资源接口的地址
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    content, assets = collect_assets(content, Path(base_dir))
+    if assets:
+        print(f"已收集资源文件: {len(set(assets))} 个")
+    
     # 解析Markdown文件获取标题
     lines = content.split('\n')
     title = "默认标题"
@@ -23,33 +32,29 @@ def import_articles(file_path: str, clear_existing: bool = False):
     
     # 使用文件名（不含扩展名）作为备选标题
     if title == "默认标题":
-        import os
         title = os.path.splitext(os.path.basename(file_path))[0]
     
-    # 导入文章
-    with Session(engine) as session:
+    # 导入文章，和接口使用同样的crud函数，分片模式下也会写入正确的分片
+    with open_session() as session:
         # 如果需要清除现有数据
         if clear_existing:
             # 删除所有现有文章
-            articles = session.query(Article).all()
-            for article in articles:
-                session.delete(article)
-            session.commit()
+            for article in get_articles(session):
+                delete_article(session, article.id)
             print("已清除现有文章")
         
-        # 创建新文章对象
-        article = Article(
-            title=title,
-            content=content,
+        # 创建新文章并添加到数据库
+        article = create_article(
+            session,
+            ArticleCreate(title=title, content=content),
             created_at=datetime.now()
         )
-        
-        # 添加到数据库
-        session.add(article)
-        session.commit()
-        session.refresh(article)
         print(f"成功导入文章: {article.title}")
 
+        # 相关文章索引不存在时crud函数不会写入索引，导入完成后检查索引，不存在或不完整时根据全部文章重新生成
+        if sync_related_index(session):
+            print("已重新生成相关文章索引")
+
 def main():
     parser = argparse.ArgumentParser(description='导入文章到数据库')
     parser.add_argument('file', help='要导入的Markdown文件路径')
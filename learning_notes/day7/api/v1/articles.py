@@ -1,26 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, status  # 从fastapi导入所需模块
+import json  # 导入json模块，用于直接编码响应
+from datetime import datetime  # 导入datetime时间处理模块
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status  # 从fastapi导入所需模块
 from sqlmodel import Session  # 从sqlmodel导入Session会话
-from typing import List  # 导入List类型提示
+from typing import Any, List  # 导入类型提示
 from database import get_session  # 从database模块导入get_session函数
-from crud.article import create_article, get_articles, get_article_by_id, update_article, delete_article  # 从crud.article导入各种操作函数
-from schemas.article import ArticleCreate, ArticleRead, ArticleUpdate  # 从schemas.article导入各种模型
+from crud.article import create_article, get_article_rows, get_article_row_by_id, get_related_articles, update_article, delete_article  # 从crud.article导入各种操作函数
+from schemas.article import ArticleCreate, ArticleRead, ArticleUpdate, PopularArticles, RelatedArticle  # 从schemas.article导入各种模型
+from utils.view_counter import TOP_N, view_counter  # 导入阅读数聚合器
+from utils.query_cache import article_cache  # 导入文章查询缓存
 
 router = APIRouter(prefix="/articles", tags=["articles"])  # 创建API路由器，设置路由前缀和标签
 
+def _json_default(value: Any) -> Any:  # json无法直接编码的类型在这里处理
+    if isinstance(value, datetime):  # datetime按ISO格式输出，和pydantic的输出一致
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text  # pydantic把UTC时区写成Z
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def fast_json_response(data: Any) -> Response:  # 直接把数据库读出来的数据编码成JSON响应
+    # 数据来自我们自己的数据库，是可信的，所以跳过response_model的校验和拷贝
+    # 直接返回Response时FastAPI不会再做校验，但路由上的response_model仍然用于生成OpenAPI文档
+    content = json.dumps(data, default=_json_default, ensure_ascii=False, separators=(",", ":"))  # 和JSONResponse使用相同的编码参数
+    return Response(content=content, media_type="application/json")
+
 @router.post("/", response_model=ArticleRead, status_code=status.HTTP_201_CREATED)  # 定义创建文章的POST路由，设置响应模型和状态码
 def create_new_article(*, session: Session = Depends(get_session), article: ArticleCreate):  # 定义创建新文章的处理函数
     return create_article(session, article)  # 调用crud模块的create_article函数创建文章
 
 @router.get("/", response_model=List[ArticleRead])  # 定义获取所有文章的GET路由，设置响应模型为文章列表
 def read_all_articles(*, session: Session = Depends(get_session)):  # 定义获取所有文章的处理函数
-    return get_articles(session)  # 调用crud模块的get_articles函数获取所有文章
+    return fast_json_response(get_article_rows(session))  # 只查询需要的列，直接编码返回
+
+@router.get("/popular", response_model=PopularArticles)  # 定义获取排行榜的GET路由，必须放在/{article_id}前面
+def read_popular_articles(*, limit: int = Query(default=10, ge=1, le=TOP_N)):  # 定义获取排行榜的处理函数，排行榜直接从内存读取
+    return {  # 返回累计阅读排行和热度排行
+        "most_read": [{"id": article_id, "views": views} for article_id, views in view_counter.popular(limit)],
+        "trending": [{"id": article_id, "score": score} for article_id, score in view_counter.trending(limit)],
+    }
+
+@router.get("/cache/stats")  # 定义查看查询缓存命中情况的GET路由
+def read_cache_stats():  # 定义查看缓存命中情况的处理函数
+    return article_cache.stats()  # 返回缓存条目数、命中次数和命中率
 
 @router.get("/{article_id}", response_model=ArticleRead)  # 定义获取单个文章的GET路由，设置响应模型
 def read_single_article(*, session: Session = Depends(get_session), article_id: int):  # 定义获取单个文章的处理函数
-    article = get_article_by_id(session, article_id)  # 调用crud模块的get_article_by_id函数获取文章
+    article = get_article_row_by_id(session, article_id)  # 调用crud模块的get_article_row_by_id函数获取文章
     if not article:  # 如果文章不存在
         raise HTTPException(status_code=404, detail="Article not found")  # 抛出404异常
-    return article  # 返回文章对象
+    view_counter.record(article_id)  # 记录一次阅读，只写内存，后台定期批量写入数据库
+    return fast_json_response(article)  # 直接编码返回文章数据
+
+@router.get("/{article_id}/related", response_model=List[RelatedArticle])  # 定义获取相关文章的GET路由，设置响应模型为相关文章列表
+def read_related_articles(*, session: Session = Depends(get_session), article_id: int, k: int = Query(default=5, ge=1, le=50)):  # 定义获取相关文章的处理函数
+    if not get_article_row_by_id(session, article_id):  # 如果文章不存在
+        raise HTTPException(status_code=404, detail="Article not found")  # 抛出404异常
+    return get_related_articles(session, article_id, k)  # 调用crud模块的get_related_articles函数获取相关文章
 
 @router.put("/{article_id}", response_model=ArticleRead)  # 定义更新文章的PUT路由，设置响应模型
 def update_single_article(  # 定义更新文章的处理函数
@@ -0,0 +1,33 @@
+import mimetypes  # 导入mimetypes模块，用于根据扩展名判断文件类型
+from fastapi import APIRouter, HTTPException, Request, Response, status  # 从fastapi导入所需模块
+from fastapi.responses import FileResponse  # 导入FileResponse，文件由服务器直接发送，支持Range请求
+from utils.asset_store import asset_path, gzip_variant_path  # 从utils.asset_store导入资源查找函数
+
+router = APIRouter(prefix="/assets", tags=["assets"])  # 创建API路由器，设置路由前缀和标签
+
+# 文件名就是内容哈希，内容永远不会变，所以可以让浏览器长期缓存
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/{name}")  # 定义获取资源文件的GET路由
+def read_asset(*, request: Request, name: str):  # 定义获取资源文件的处理函数
+    path = asset_path(name)  # 根据文件名查找资源
+    if path is None:  # 如果资源不存在
+        raise HTTPException(status_code=404, detail="Asset not found")  # 抛出404异常
+
+    digest = name.split(".")[0]
+    etag = f'"{digest}"'  # 用内容哈希作为ETag
+    gzip_etag = f'"{digest}-gz"'  # 压缩后的内容是另一种表示，使用不同的ETag
+    gz_path = gzip_variant_path(path)  # 预压缩文件路径
+    # Range请求按原始文件的字节计算，所以只有非Range请求才返回预压缩文件
+    use_gzip = "range" not in request.headers and "gzip" in request.headers.get("accept-encoding", "") and gz_path.is_file()
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": gzip_etag if use_gzip else etag, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match or gzip_etag in if_none_match:  # 客户端已经缓存了这个文件（任意一种表示，内容都不会变）
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)  # 返回304，不再发送内容
+
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"  # 判断文件类型
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return FileResponse(gz_path, media_type=media_type, headers=headers)  # 返回预压缩文件
+    # FileResponse由服务器分块发送文件（支持时使用sendfile），不会阻塞事件循环，也支持Range请求
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,72 @@
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from typing import List
+from pydantic import TypeAdapter
+from sqlmodel import SQLModel, Session, create_engine
+from models.article import Article
+from schemas.article import ArticleRead
+from crud.article import get_articles, load_article_rows
+from api.v1.articles import fast_json_response
+
+def prepare_engine(rows: int):
+    """创建内存数据库并写入测试文章"""
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(rows):
+            session.add(Article(
+                title=f"文章{i}",
+                content="# 标题\n\n" + "这是一段测试内容。" * 50,
+                author="benchmark",
+                published=i % 2 == 0,
+                created_at=datetime.now(timezone.utc)
+            ))
+        session.commit()
+    return engine
+
+def response_model_path(engine, adapter: TypeAdapter) -> bytes:
+    """模拟FastAPI使用response_model时的处理：查询ORM对象、校验、转换、编码"""
+    with Session(engine) as session:
+        articles = get_articles(session)
+        validated = adapter.validate_python(articles, from_attributes=True)
+        data = adapter.dump_python(validated, mode="json")
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def fast_path(engine) -> bytes:
+    """快速路径：只查询列，直接编码成JSON"""
+    with Session(engine) as session:
+        return fast_json_response(load_article_rows(session)).body
+
+def measure(func, repeat: int) -> float:
+    """多次运行取最短时间，单位毫秒"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def run_benchmark(sizes: List[int], repeat: int):
+    """对比两种序列化方式在不同数据量下的耗时"""
+    adapter = TypeAdapter(List[ArticleRead])
+    for rows in sizes:
+        engine = prepare_engine(rows)
+        # 两种方式输出的JSON必须完全一致
+        assert response_model_path(engine, adapter) == fast_path(engine)
+        slow = measure(lambda: response_model_path(engine, adapter), repeat)
+        fast = measure(lambda: fast_path(engine), repeat)
+        print(f"{rows:>6} 行: response_model {slow:8.1f} ms | 快速路径 {fast:8.1f} ms | 提升 {slow / fast:4.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description='对比文章列表的两种序列化方式')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='测试的文章数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每种方式运行的次数')
+
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,107 @@
 from sqlmodel import Session, select  # 从sqlmodel导入Session会话和select查询函数
+from sqlalchemy.exc import IntegrityError  # 导入唯一约束冲突异常
+from database import SHARD_COUNT, allocate_article_id  # 从database导入分片配置和id分配函数
+from utils.view_counter import view_counter  # 导入阅读数聚合器
+from utils.related_index import related_index  # 导入相关文章索引
+from utils.query_cache import article_cache  # 导入文章查询缓存
 from models.article import Article  # 从models.article导入Article数据模型
-from schemas.article import ArticleCreate, ArticleUpdate  # 从schemas.article导入ArticleCreate和ArticleUpdate模型
-from typing import List, Optional  # 导入List和Optional类型提示
+from schemas.article import ArticleCreate, ArticleUpdate, ArticleRead  # 从schemas.article导入ArticleCreate、ArticleUpdate和ArticleRead模型
+from typing import Any, Dict, List, Optional  # 导入类型提示
+from datetime import datetime  # 导入datetime时间处理模块
 
-def create_article(session: Session, article_create: ArticleCreate) -> Article:  # 定义创建文章函数，接收会话和创建文章参数，返回Article对象
+# 快速读取路径使用的字段，顺序与ArticleRead保持一致，这样输出的JSON和response_model序列化的结果一样
+READ_FIELDS = tuple(ArticleRead.model_fields)  # ArticleRead的字段名元组
+READ_COLUMNS = [getattr(Article, field) for field in READ_FIELDS]  # 对应的数据库列
+
+ARTICLE_LIST_KEY = ("articles",)  # 文章列表在缓存中的键
+
+def article_cache_key(article_id: int) -> tuple:  # 定义单篇文章在缓存中的键
+    return ("article", article_id)
+
+def invalidate_article_cache(article_id: int):  # 定义修改文章后删除相关缓存的函数，只删除这篇文章和文章列表
+    article_cache.invalidate(article_cache_key(article_id), ARTICLE_LIST_KEY)
+
+def article_text(article: Article) -> str:  # 定义计算相关文章时使用的文本，标题和内容合在一起
+    return f"{article.title}\n{article.content}"
+
+def get_related_articles(session: Session, article_id: int, k: int) -> List[Dict[str, Any]]:  # 定义获取相关文章函数，返回包含id、标题和相似度的字典列表
+    neighbours = related_index.related(article_id, k)  # 从索引中找出最相似的文章
+    if not neighbours:  # 没有相关文章
+        return []
+    ids = [neighbour_id for neighbour_id, _ in neighbours]
+    titles = dict(session.exec(select(Article.id, Article.title).where(Article.id.in_(ids))).all())  # 只查询这几篇文章的标题
+    return [
+        {"id": neighbour_id, "title": titles[neighbour_id], "score": score}
+        for neighbour_id, score in neighbours
+        if neighbour_id in titles
+    ]
+
+def sync_related_index(session: Session, force: bool = False) -> bool:  # 定义检查相关文章索引的函数，索引不存在、和数据库中的文章不一致或force为True时重新生成，返回是否重新生成
+    article_ids = set(session.exec(select(Article.id)).all())  # 只查询id，和索引中的文章比较
+    if not force and related_index.exists() and related_index.article_ids() == article_ids:  # 索引完整，直接使用
+        related_index.load()
+        return False
+    related_index.rebuild((article.id, article_text(article)) for article in get_articles(session))  # 根据所有文章重新生成索引
+    return True
+
+def create_article(session: Session, article_create: ArticleCreate, created_at: Optional[datetime] = None) -> Article:  # 定义创建文章函数，接收会话、创建文章参数和可选的创建时间，返回Article对象
     # 下面的.from_orm方法被弃用了怎么办？
     # db_article = Article.from_orm(article_create)  # 从ORM对象创建Article实例
-    db_article = Article(**article_create.model_dump())
-    session.add(db_article)  # 将文章对象添加到会话中
-    session.commit()  # 提交会话，保存更改到数据库
+    db_article = Article(**article_create.model_dump(), created_at=created_at)
+    if SHARD_COUNT:  # 分片模式下id由程序分配，id决定文章所在的分片
+        db_article.id = allocate_article_id(db_article)
+        for attempt in range(3):  # 其他进程可能用了同一个id，冲突时重新读取分片里最大的id再试
+            try:
+                session.add(db_article)
+                session.commit()
+                break
+            except IntegrityError:
+                session.rollback()
+                if attempt == 2:
+                    raise
+                db_article.id = allocate_article_id(db_article, refresh=True)
+    else:
+        session.add(db_article)  # 将文章对象添加到会话中
+        session.commit()  # 提交会话，保存更改到数据库
     session.refresh(db_article)  # 刷新文章对象，获取数据库中的最新数据
+    invalidate_article_cache(db_article.id)  # 删除文章列表缓存，以及之前缓存的"文章不存在"结果
+    related_index.update(db_article.id, article_text(db_article))  # 把新文章加入相关文章索引
     return db_article  # 返回创建的文章对象
 
 def get_articles(session: Session) -> List[Article]:  # 定义获取所有文章函数，接收会话参数，返回Article列表
-    articles = session.exec(select(Article)).all()  # 执行查询获取所有文章
+    articles = session.exec(select(Article).order_by(Article.id)).all()  # 执行查询获取所有文章，按id排序
+    if SHARD_COUNT:  # 分片模式下结果是各分片有序结果的拼接，合并成整体有序
+        articles = sorted(articles, key=lambda article: article.id)
     return articles  # 返回文章列表
 
 def get_article_by_id(session: Session, article_id: int) -> Optional[Article]:  # 定义根据ID获取文章函数，接收会话和文章ID参数，返回可选的Article对象
     article = session.get(Article, article_id)  # 根据ID获取文章
     return article  # 返回文章对象或None
 
+def load_article_rows(session: Session) -> List[Dict[str, Any]]:  # 定义快速获取所有文章函数，只查询需要的列，直接返回字典列表，不经过缓存
+    rows = session.exec(select(*READ_COLUMNS).order_by(Article.id)).all()  # 只查询列，不创建ORM对象，按id排序
+    if SHARD_COUNT:  # 分片模式下合并各分片的有序结果
+        rows = sorted(rows, key=lambda row: row.id)
+    return [dict(zip(READ_FIELDS, row)) for row in rows]  # 把每一行转换成字典
+
+def load_article_row_by_id(session: Session, article_id: int) -> Optional[Dict[str, Any]]:  # 定义快速获取单个文章函数，返回字典或None，不经过缓存
+    row = session.exec(select(*READ_COLUMNS).where(Article.id == article_id)).first()  # 根据ID只查询需要的列
+    if row is None:  # 如果文章不存在
+        return None  # 返回None
+    return dict(zip(READ_FIELDS, row))  # 把这一行转换成字典
+
+def get_article_rows(session: Session) -> List[Dict[str, Any]]:  # 定义带缓存的获取所有文章函数，返回的字典不能修改
+    return article_cache.get_or_load(ARTICLE_LIST_KEY, lambda: load_article_rows(session))
+
+def get_article_row_by_id(session: Session, article_id: int) -> Optional[Dict[str, Any]]:  # 定义带缓存的获取单个文章函数，文章不存在的结果也会缓存
+    return article_cache.get_or_load(article_cache_key(article_id), lambda: load_article_row_by_id(session, article_id))
+
 def update_article(session: Session, article_id: int, article_update: ArticleUpdate) -> Optional[Article]:  # 定义更新文章函数，接收会话、文章ID和更新参数，返回可选的Article对象
     article = session.get(Article, article_id)  # 根据ID获取文章
     if not article:  # 如果文章不存在
         return None  # 返回None
     
+    old_text = article_text(article)  # 记录修改前的文本，用于更新相关文章索引
     article_data = article_update.dict(exclude_unset=True)  # 将更新参数转换为字典，排除未设置的字段
     for key, value in article_data.items():  # 遍历更新数据
         setattr(article, key, value)  # 设置文章对象的属性值
@@ -32,6 +109,8 @@ def update_article(session: Session, article_id: int, article_update: ArticleUpd
     session.add(article)  # 将更新后的文章对象添加到会话中
     session.commit()  # 提交会话，保存更改到数据库
     session.refresh(article)  # 刷新文章对象，获取数据库中的最新数据
+    invalidate_article_cache(article_id)  # 删除这篇文章和文章列表的缓存
+    related_index.update(article.id, article_text(article), old_text)  # 更新这篇文章在相关文章索引中的向量
     return article  # 返回更新后的文章对象
 
 def delete_article(session: Session, article_id: int) -> bool:  # 定义删除文章函数，接收会话和文章ID参数，返回布尔值
@@ -39,6 +118,10 @@ def delete_article(session: Session, article_id: int) -> bool:  # 定义删除
     if not article:  # 如果文章不存在
         return False  # 返回False
     
+    old_text = article_text(article)  # 记录删除前的文本，用于更新相关文章索引
     session.delete(article)  # 从会话中删除文章对象
     session.commit()  # 提交会话，保存更改到数据库
+    invalidate_article_cache(article_id)  # 删除这篇文章和文章列表的缓存
+    view_counter.forget(article_id)  # 同时移除文章的阅读数
+    related_index.remove(article_id, old_text)  # 从相关文章索引中移除
     return True  # 返回True表示删除成功
\ No newline at end of file
@@ -1,5 +1,14 @@
-from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+import itertools
+import os
+import threading
+import zlib
+from sqlmodel import SQLModel, create_engine, Session, select, func
+from sqlalchemy.ext.horizontal_shard import ShardedSession as BaseShardedSession
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from typing import Dict, Generator, List
+from models.article import Article
+from models.article_view import ArticleView
 
 # 定义数据库连接URL
 DATABASE_URL = "sqlite:///./tutorial.db"
@@ -7,14 +16,115 @@ DATABASE_URL = "sqlite:///./tutorial.db"
 # 创建数据库引擎
 engine = create_engine(DATABASE_URL, echo=True)
 
+# 分片模式：TUTORIAL_DB_SHARDS大于0时，文章分散存储在多个SQLite文件中，每个文件有自己的写锁
+SHARD_COUNT = int(os.getenv("TUTORIAL_DB_SHARDS", "0"))
+# 新文章选择分片的方式：id表示轮流分配（按id哈希定位），author表示同一作者的文章放在同一个分片
+SHARD_KEY = os.getenv("TUTORIAL_DB_SHARD_KEY", "id")
+SHARD_URL_TEMPLATE = "sqlite:///./tutorial_shard_{}.db"
+
+
+def create_shard_engines(shard_count: int) -> Dict[str, object]:
+    """为每个分片创建一个数据库引擎，键是分片编号字符串"""
+    return {
+        str(index): create_engine(SHARD_URL_TEMPLATE.format(index), echo=True)
+        for index in range(shard_count)
+    }
+
+
+shard_engines = create_shard_engines(SHARD_COUNT)
+
+
+# 分片规则：文章id除以分片数的余数就是它所在的分片，
+# 新文章的id在所选分片内按步长SHARD_COUNT递增，所以无论按什么键选分片，都能通过id直接找到分片
+def shard_for_id(article_id: int) -> str:
+    return str(article_id % SHARD_COUNT)
+
+
+_round_robin = itertools.count()
+_next_ids: Dict[str, int] = {}
+_id_lock = threading.Lock()
+
+
+def choose_shard(article: Article) -> str:
+    """为新文章选择分片"""
+    if SHARD_KEY == "author" and article.author:
+        return str(zlib.crc32(article.author.encode("utf-8")) % SHARD_COUNT)
+    return str(next(_round_robin) % SHARD_COUNT)
+
+
+def allocate_article_id(article: Article, refresh: bool = False) -> int:
+    """为新文章分配一个全局唯一的id，id % SHARD_COUNT等于所选分片的编号"""
+    shard_id = choose_shard(article) if article.id is None else shard_for_id(article.id)
+    with _id_lock:
+        if refresh or shard_id not in _next_ids:
+            # 从分片里读出当前最大的id，算出下一个属于这个分片的id
+            with Session(shard_engines[shard_id]) as session:
+                max_id = session.exec(select(func.max(Article.id))).one() or 0
+            _next_ids[shard_id] = (max_id // SHARD_COUNT + 1) * SHARD_COUNT + int(shard_id)
+        article_id = _next_ids[shard_id]
+        _next_ids[shard_id] += SHARD_COUNT
+    return article_id
+
+
+def _shard_chooser(mapper, instance, clause=None) -> str:
+    # 保存对象时根据id选择分片，新文章的id在crud中提前分配好
+    return shard_for_id(instance.id)
+
+
+def _identity_chooser(mapper, primary_key, **kwargs) -> List[str]:
+    # 按主键查找对象时只看一个分片
+    return [shard_for_id(primary_key[0])]
+
+
+def _execute_chooser(context) -> List[str]:
+    # 查询条件里有 id == 值 时只查对应的分片，否则查询所有分片
+    whereclause = getattr(context.statement, "whereclause", None)
+    if whereclause is not None:
+        for node in visitors.iterate(whereclause):
+            if (
+                isinstance(node, BinaryExpression)
+                and node.operator is operators.eq
+                and getattr(node.left, "key", None) == "id"
+                and isinstance(node.right, BindParameter)
+            ):
+                value = node.right.effective_value
+                if isinstance(context.parameters, dict):
+                    value = context.parameters.get(node.right.key, value)
+                if value is not None:
+                    return [shard_for_id(value)]
+    return list(shard_engines)
+
+
+class ShardedSession(BaseShardedSession, Session):
+    """支持session.exec的分片会话，用法和普通Session一样"""
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            shard_chooser=_shard_chooser,
+            identity_chooser=_identity_chooser,
+            execute_chooser=_execute_chooser,
+            shards=shard_engines,
+            **kwargs
+        )
+
 
 # 创建数据库表
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    if SHARD_COUNT:
+        for shard_engine in shard_engines.values():
+            SQLModel.metadata.create_all(shard_engine, tables=[Article.__table__])
+        # 阅读数不分片，统一保存在主数据库中
+        SQLModel.metadata.create_all(engine, tables=[ArticleView.__table__])
+    else:
+        SQLModel.metadata.create_all(engine)
+
+
+# 创建数据库会话，分片模式下使用分片会话
+def open_session() -> Session:
+    return ShardedSession() if SHARD_COUNT else Session(engine)
 
 
 # 获取数据库会话
 def get_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    with open_session() as session:
         yield session
-
@@ -1,15 +1,23 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
+from database import create_db_and_tables, open_session
+from crud.article import sync_related_index
 from api.v1.api import api_router
+from utils.view_counter import view_counter
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 应用启动时创建数据库表
     create_db_and_tables()
+    # 打开相关文章索引，索引文件不存在或和数据库中的文章不一致时（例如导入脚本在没有索引时写入过文章）重新生成
+    with open_session() as session:
+        sync_related_index(session)
+    # 启动阅读数后台写入线程
+    view_counter.start()
     yield
-    # 应用关闭时可以执行清理工作
+    # 应用关闭时把还没写入的阅读数写入数据库
+    view_counter.stop()
 
 
 app = FastAPI(lifespan=lifespan, title="Tutorial Site API", version="1.0.0")  # 创建FastAPI应用实例，设置标题和版本
@@ -0,0 +1,6 @@
+from sqlmodel import SQLModel, Field  # 从sqlmodel导入SQLModel基类和Field字段定义
+
+class ArticleView(SQLModel, table=True):  # 定义ArticleView阅读数模型类，单独一张表，不用修改已有的article表
+    __tablename__ = "article_view"  # 表名
+    article_id: int = Field(primary_key=True)  # 文章ID字段，主键
+    views: int = Field(default=0, index=True)  # 累计阅读次数字段，整数类型，默认为0，建索引方便读取排行榜
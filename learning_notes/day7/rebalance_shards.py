@@ -0,0 +1,88 @@
+import argparse
+import glob
+import os
+import shutil
+from sqlalchemy import inspect
+from sqlmodel import SQLModel, Session, create_engine, select
+from database import DATABASE_URL, SHARD_URL_TEMPLATE
+from models.article import Article
+
+BATCH_SIZE = 1000  # 每次提交的文章数量
+
+def sqlite_path(url: str) -> str:
+    """从sqlite连接URL中取出文件路径"""
+    return url[len("sqlite:///"):]
+
+def rebalance(shard_count: int, include_main: bool = True):
+    """把单库和现有分片中的文章按 id % shard_count 重新分配到新的分片文件中"""
+    # 数据来源：所有已有的分片文件，以及还没有迁移过的tutorial.db
+    sources = sorted(glob.glob(sqlite_path(SHARD_URL_TEMPLATE.format("[0-9]*"))))
+    main_path = sqlite_path(DATABASE_URL)
+    main_engine = create_engine(DATABASE_URL)
+    # 第一次迁移后tutorial.db中的article表会被删除，之后只在分片之间重新分配，旧数据不会覆盖分片中的修改和删除
+    migrate_main = include_main and os.path.exists(main_path) and inspect(main_engine).has_table(Article.__tablename__)
+    if migrate_main:
+        sources.append(main_path)  # 放在最后，同一篇文章以分片中的为准
+
+    # 先写到临时文件，全部写完再替换，中途失败不会破坏现有数据
+    targets = [sqlite_path(SHARD_URL_TEMPLATE.format(index)) + ".new" for index in range(shard_count)]
+    for target in targets:
+        if os.path.exists(target):
+            os.remove(target)
+    target_engines = [create_engine(f"sqlite:///{target}") for target in targets]
+    for target_engine in target_engines:
+        SQLModel.metadata.create_all(target_engine)
+    target_sessions = [Session(target_engine) for target_engine in target_engines]
+
+    seen = set()
+    counts = [0] * shard_count
+    for source in sources:
+        source_engine = create_engine(f"sqlite:///{source}")
+        with Session(source_engine) as source_session:
+            for article in source_session.exec(select(Article).execution_options(yield_per=BATCH_SIZE)):
+                if article.id in seen:  # 同一篇文章可能同时存在于单库和旧分片中，只保留一份
+                    continue
+                seen.add(article.id)
+                index = article.id % shard_count
+                target_sessions[index].add(Article(**article.model_dump()))
+                counts[index] += 1
+                if counts[index] % BATCH_SIZE == 0:
+                    target_sessions[index].commit()
+        source_engine.dispose()
+        print(f"已读取: {source}")
+
+    for target_session, target_engine in zip(target_sessions, target_engines):
+        target_session.commit()
+        target_session.close()
+        target_engine.dispose()
+
+    # 替换分片文件，并删除多余的旧分片
+    for target in targets:
+        os.replace(target, target[:-len(".new")])
+    current = {target[:-len(".new")] for target in targets}
+    for source in sources:
+        if source != main_path and source not in current:
+            os.remove(source)
+
+    # tutorial.db中的文章已经迁移到分片：先备份，再删除article表（阅读数等其他表保留）
+    if migrate_main:
+        shutil.copyfile(main_path, main_path + ".bak")
+        Article.__table__.drop(main_engine)
+        print(f"已迁移 {main_path} 中的文章，原文件备份为 {main_path}.bak")
+    main_engine.dispose()
+
+    for index, count in enumerate(counts):
+        print(f"分片 {index}: {count} 篇文章")
+    print(f"重新分配完成，请设置环境变量 TUTORIAL_DB_SHARDS={shard_count} 后启动服务")
+
+def main():
+    parser = argparse.ArgumentParser(description='把文章重新分配到多个SQLite分片文件中')
+    parser.add_argument('shards', type=int, help='分片数量')
+    parser.add_argument('--skip-main', action='store_true', help='不迁移tutorial.db中的文章，只在已有分片之间重新分配')
+
+    args = parser.parse_args()
+
+    rebalance(args.shards, not args.skip_main)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import argparse
+from database import open_session, create_db_and_tables
+from crud.article import sync_related_index
+
+def rebuild_related_index(force: bool = True):
+    """根据数据库中的全部文章重新生成相关文章索引"""
+    create_db_and_tables()
+    with open_session() as session:
+        rebuilt = sync_related_index(session, force)
+    print("相关文章索引已重新生成" if rebuilt else "相关文章索引和数据库一致，不需要重新生成")
+
+def main():
+    parser = argparse.ArgumentParser(description='根据数据库中的文章重新生成相关文章索引')
+    parser.add_argument('--if-needed', action='store_true', help='只在索引不存在或和数据库不一致时重新生成')
+
+    args = parser.parse_args()
+
+    rebuild_related_index(not args.if_needed)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel  # 从sqlmodel导入SQLModel基类
-from typing import Optional  # 导入Optional类型提示
+from typing import List, Optional  # 导入List和Optional类型提示
 from datetime import datetime  # 导入datetime时间处理模块
 
 class ArticleBase(SQLModel):  # 定义ArticleBase基础模型类，继承SQLModel
@@ -17,4 +17,21 @@ class ArticleUpdate(ArticleBase):  # 定义ArticleUpdate更新模型类，继承
 
 class ArticleRead(ArticleBase):  # 定义ArticleRead读取模型类，继承ArticleBase
     id: int  # 文章ID字段，整数类型
-    created_at: Optional[datetime] = None  # 创建时间字段，可选datetime类型，默认为空
\ No newline at end of file
+    created_at: Optional[datetime] = None  # 创建时间字段，可选datetime类型，默认为空
+
+class PopularArticle(SQLModel):  # 定义PopularArticle累计阅读排行项模型类
+    id: int  # 文章ID字段，整数类型
+    views: int  # 累计阅读次数字段，整数类型
+
+class TrendingArticle(SQLModel):  # 定义TrendingArticle热度排行项模型类
+    id: int  # 文章ID字段，整数类型
+    score: float  # 按时间衰减后的热度字段，浮点类型
+
+class PopularArticles(SQLModel):  # 定义PopularArticles排行榜响应模型类
+    most_read: List[PopularArticle]  # 累计阅读最多的文章列表
+    trending: List[TrendingArticle]  # 最近最热的文章列表
+
+class RelatedArticle(SQLModel):  # 定义RelatedArticle相关文章模型类
+    id: int  # 文章ID字段，整数类型
+    title: str  # 文章标题字段，字符串类型
+    score: float  # 余弦相似度字段，浮点类型
\ No newline at end of file
@@ -0,0 +1,122 @@
+# 静态资源存储工具：把Markdown引用的本地图片和附件按内容哈希保存到磁盘
+import gzip
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+ASSET_DIR = Path(__file__).resolve().parent.parent / "assets"  # 资源文件保存目录
+ASSET_URL_PREFIX = "/api/v1/assets/"  # 资源文件对外访问的路径前缀
+COMPRESSIBLE_SUFFIXES = {".svg", ".txt", ".md", ".json", ".csv", ".xml", ".html", ".css", ".js"}  # 值得预先压缩的文本类文件
+CHUNK_SIZE = 1024 * 1024  # 计算哈希时每次读取的字节数
+
+# 匹配Markdown中的图片和链接，例如 ![说明](images/a.png "标题") 或 [附件](files/a.pdf)
+LINK_PATTERN = re.compile(r'(!?\[[^\]]*\]\()(<[^>]+>|[^)\s]+)((?:\s+"[^"]*")?\))')
+# 匹配引用式链接的定义行，例如 [logo]: images/a.png "标题"，正文中用 ![说明][logo] 引用（脚注定义[^1]除外）
+DEFINITION_PATTERN = re.compile(r"^( {0,3}\[(?!\^)[^\]]+\]:[ \t]*)(<[^>]+>|\S+)(.*)$")
+# 匹配直接写在Markdown中的HTML图片，例如 <img src="images/a.png" width="200">
+IMG_PATTERN = re.compile(r"""(<img\b[^>]*?\bsrc\s*=\s*["'])([^"'>]+)(["'])""", re.IGNORECASE)
+CODE_SPAN_PATTERN = re.compile(r"(`+).*?(?<!`)\1(?!`)")  # 行内代码，前后的反引号数量相同
+FENCE_PATTERN = re.compile(r"^\s*(`{3,}|~{3,})")  # 代码块的开始和结束标记
+ASSET_NAME_PATTERN = re.compile(r"^[0-9a-f]{64}(\.[0-9a-z]+)?$")  # 资源文件名：sha256哈希 + 扩展名
+
+
+def file_digest(path: Path) -> str:
+    """分块计算文件的sha256哈希，大文件不会一次性读进内存"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_asset(source: Path) -> str:
+    """把文件按内容哈希保存到资源目录，返回资源文件名，相同内容只保存一次"""
+    ASSET_DIR.mkdir(parents=True, exist_ok=True)
+    name = file_digest(source) + source.suffix.lower()
+    target = ASSET_DIR / name
+    if not target.exists():
+        # 先写临时文件再改名，避免服务读到写了一半的文件
+        temp = target.with_name(target.name + ".tmp")
+        shutil.copyfile(source, temp)
+        os.replace(temp, target)
+    if target.suffix in COMPRESSIBLE_SUFFIXES:
+        _write_gzip_variant(target)
+    return name
+
+
+def _write_gzip_variant(target: Path):
+    """生成预压缩的.gz文件，只有压缩后更小才保留"""
+    gz_path = gzip_variant_path(target)
+    if gz_path.exists():
+        return
+    data = gzip.compress(target.read_bytes(), compresslevel=9, mtime=0)
+    if len(data) < target.stat().st_size:
+        temp = gz_path.with_name(gz_path.name + ".tmp")
+        temp.write_bytes(data)
+        os.replace(temp, gz_path)
+
+
+def gzip_variant_path(path: Path) -> Path:
+    """资源文件对应的预压缩文件路径"""
+    return path.with_name(path.name + ".gz")
+
+
+def collect_assets(content: str, base_dir: Path) -> Tuple[str, List[str]]:
+    """收集Markdown引用的本地文件，保存到资源目录，并把引用改成资源接口的地址"""
+    stored = []
+
+    def replace(match: re.Match) -> str:
+        # 三种匹配的第2组都是地址，第1组和第3组是地址前后保持不变的部分
+        url = match.group(2)
+        raw = url[1:-1] if url.startswith("<") else url
+        # 跳过网络地址、页内锚点和绝对路径
+        if re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*:", raw) or raw.startswith(("#", "/")):
+            return match.group(0)
+        source = (base_dir / unquote(raw.split("#")[0].split("?")[0])).resolve()
+        if not source.is_file():
+            return match.group(0)
+        name = store_asset(source)
+        stored.append(name)
+        return match.group(1) + ASSET_URL_PREFIX + name + match.group(3)
+
+    def replace_text(text: str) -> str:
+        # 行内代码里的示例链接保持原样，只改写代码之间的正文
+        parts = []
+        start = 0
+        for code in CODE_SPAN_PATTERN.finditer(text):
+            parts.append(IMG_PATTERN.sub(replace, LINK_PATTERN.sub(replace, text[start:code.start()])))
+            parts.append(code.group(0))
+            start = code.end()
+        parts.append(IMG_PATTERN.sub(replace, LINK_PATTERN.sub(replace, text[start:])))
+        return "".join(parts)
+
+    # 代码块里的示例链接保持原样，只改写正文中的引用
+    lines = []
+    opening = None
+    for line in content.split("\n"):
+        match = FENCE_PATTERN.match(line)
+        if opening is None:
+            if match:
+                opening = match.group(1)
+            elif DEFINITION_PATTERN.match(line):
+                line = DEFINITION_PATTERN.sub(replace, line)
+            else:
+                line = replace_text(line)
+        elif match and match.group(1)[0] == opening[0] and len(match.group(1)) >= len(opening) and not line.strip().strip(opening[0]):
+            opening = None
+        lines.append(line)
+    return "\n".join(lines), stored
+
+
+def asset_path(name: str) -> Optional[Path]:
+    """根据资源文件名找到磁盘上的文件，名称不合法或文件不存在时返回None"""
+    if not ASSET_NAME_PATTERN.match(name):
+        return None
+    path = ASSET_DIR / name
+    if not path.is_file():
+        return None
+    return path
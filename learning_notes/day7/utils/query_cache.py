@@ -0,0 +1,92 @@
+# 查询结果缓存工具：进程内缓存热点文章的查询结果，带过期时间和LRU淘汰
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Set, Tuple
+
+CACHE_TTL = 30.0  # 缓存过期秒数，其他进程（例如导入脚本）直接写数据库时，最多这么久后能看到新数据
+CACHE_MAX_ENTRIES = 1024  # 最多缓存的条目数，超过时淘汰最久没有用过的
+
+
+class QueryCache:
+    """带过期时间的LRU缓存
+
+    同一个键同时只有一个线程去查询数据库，其他线程等它查完直接使用结果，避免缓存失效时大量请求同时查库。
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # 键 -> (过期时间, 值)
+        self._loading: Dict[Hashable, threading.Event] = {}  # 正在查询数据库的键
+        self._stale: Set[Hashable] = set()  # 查询过程中被失效的键，查询结果不能放进缓存
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0  # 等待其他线程查询结果的次数，等到结果后按命中计算
+        self.evictions = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """从缓存中取值，没有时调用loader查询并放入缓存"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return entry[1]
+                    del self._entries[key]  # 已过期
+                event = self._loading.get(key)
+                if event is None:  # 没有其他线程在查询，由当前线程查询
+                    event = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            event.wait()  # 等其他线程查询完成后重新读取缓存
+
+        try:
+            value = loader()
+            with self._lock:
+                if key not in self._stale:
+                    self._entries[key] = (time.monotonic() + self.ttl, value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            return value
+        finally:
+            with self._lock:
+                self._stale.discard(key)
+                del self._loading[key]
+            event.set()
+
+    def invalidate(self, *keys: Hashable):
+        """数据修改后删除对应的缓存"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                if key in self._loading:
+                    self._stale.add(key)
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._stale.update(self._loading)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中情况"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+article_cache = QueryCache()  # 整个应用共用的文章查询缓存
@@ -0,0 +1,266 @@
+# 相关文章索引工具：为每篇文章计算哈希TF-IDF向量，保存在内存映射文件中，用矩阵运算找出最相似的文章
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+
+try:
+    import fcntl  # 用文件锁保证多个进程（服务的多个worker、导入脚本）不会同时改写索引
+except ImportError:  # Windows没有fcntl，只能保证同一个进程内的安全
+    fcntl = None
+
+INDEX_DIR = "./tutorial_related"  # 索引文件目录，和tutorial.db放在一起
+DIM = 1 << 18  # 哈希后的词表大小
+TERMS_PER_ARTICLE = 64  # 每篇文章只保留权重最高的这么多个词，所有文章的向量宽度相同，方便批量计算
+INITIAL_CAPACITY = 1024  # 索引文件初始能容纳的文章数，不够时翻倍
+
+# 英文按单词切分，中文按相邻两个字切分
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> Iterable[str]:
+    """把文章内容切分成词"""
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token[0] >= "\u4e00":
+            if len(token) == 1:
+                yield token
+            for i in range(len(token) - 1):
+                yield token[i:i + 2]
+        elif len(token) > 1:
+            yield token
+
+
+def term_counts(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """把词哈希到固定大小的词表中，返回(词编号数组, 出现次数数组)"""
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) & (DIM - 1) for token in tokenize(text)),
+        dtype=np.int64,
+    )
+    return np.unique(hashes, return_counts=True)
+
+
+class RelatedIndex:
+    """相关文章索引
+
+    每篇文章占一行，只保存权重最高的TERMS_PER_ARTICLE个词（词编号和归一化后的权重），
+    这是一个宽度固定的稀疏矩阵，可以直接用内存映射文件保存，更新某篇文章时只改写它所在的行。
+    多个进程可以同时使用同一个索引：写入时加文件锁，并在meta文件里记录版本号，
+    其他进程发现版本号变化后重新读取行的分配情况，发现文件被替换（扩容或重建）后重新映射文件。
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._ids: Optional[np.ndarray] = None  # 每行对应的文章ID，空行为-1
+        self._terms: Optional[np.ndarray] = None  # 每行的词编号，空位为DIM
+        self._weights: Optional[np.ndarray] = None  # 每行的词权重，空位为0
+        self._df: Optional[np.ndarray] = None  # 每个词出现在多少篇文章中
+        self._meta: Optional[np.ndarray] = None  # meta[0]是版本号，每次写入加1
+        self._inode: Optional[int] = None  # 当前映射的ids文件，文件被替换后需要重新映射
+        self._version = -1  # 当前进程读取行分配情况时的版本号
+        self._rows: Dict[int, int] = {}  # 文章ID -> 行号
+        self._free: List[int] = []  # 可以复用的空行
+        self._size = 0  # 已经使用过的行数
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name + ".npy")
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path("ids"))
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        # 进程内用线程锁，进程之间用文件锁，读取用共享锁，写入用排他锁
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(os.path.join(self.index_dir, "lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _create_files(self, capacity: int, suffix: str = ""):
+        # 创建空的索引文件，suffix不为空时先写临时文件，之后再替换
+        open_memmap = np.lib.format.open_memmap
+        ids = open_memmap(self._path("ids" + suffix), mode="w+", dtype=np.int64, shape=(capacity,))
+        terms = open_memmap(self._path("terms" + suffix), mode="w+", dtype=np.int32, shape=(capacity, TERMS_PER_ARTICLE))
+        weights = open_memmap(self._path("weights" + suffix), mode="w+", dtype=np.float32, shape=(capacity, TERMS_PER_ARTICLE))
+        df = open_memmap(self._path("df" + suffix), mode="w+", dtype=np.int32, shape=(DIM,))
+        meta = open_memmap(self._path("meta" + suffix), mode="w+", dtype=np.int64, shape=(1,))
+        ids[:] = -1
+        terms[:] = DIM
+        return ids, terms, weights, df, meta
+
+    def _replace_files(self, names: Iterable[str]):
+        # 用临时文件替换正式文件，ids放在最后替换，其他进程看到ids文件变化时其余文件已经就绪
+        self._ids = self._terms = self._weights = self._df = self._meta = None
+        for name in sorted(names, key=lambda name: name == "ids"):
+            os.replace(self._path(name + ".tmp"), self._path(name))
+        self._inode = None
+
+    def _read_rows(self):
+        used = np.flatnonzero(self._ids >= 0)
+        self._rows = dict(zip(self._ids[used].tolist(), used.tolist()))
+        self._size = int(used[-1]) + 1 if len(used) else 0
+        self._free = np.flatnonzero(self._ids[:self._size] < 0).tolist()
+        self._version = int(self._meta[0])
+
+    def _sync(self) -> bool:
+        # 和磁盘上的索引保持一致，索引文件不存在时返回False
+        if not self.exists():
+            return False
+        inode = os.stat(self._path("ids")).st_ino
+        if self._ids is None or inode != self._inode:
+            open_memmap = np.lib.format.open_memmap
+            self._ids = open_memmap(self._path("ids"), mode="r+")
+            self._terms = open_memmap(self._path("terms"), mode="r+")
+            self._weights = open_memmap(self._path("weights"), mode="r+")
+            self._df = open_memmap(self._path("df"), mode="r+")
+            self._meta = open_memmap(self._path("meta"), mode="r+")
+            self._inode = inode
+            self._read_rows()
+        elif int(self._meta[0]) != self._version:  # 其他进程改过索引
+            self._read_rows()
+        return True
+
+    def _commit(self):
+        # 写入完成：版本号加1并刷到磁盘
+        self._meta[0] += 1
+        self._version = int(self._meta[0])
+        for array in (self._ids, self._terms, self._weights, self._df, self._meta):
+            array.flush()
+
+    def load(self):
+        """打开已有的索引文件"""
+        with self._locked(exclusive=False):
+            self._sync()
+
+    def article_ids(self) -> Set[int]:
+        """索引中所有文章的ID，用于检查索引是否和数据库一致"""
+        with self._locked(exclusive=False):
+            return set(self._rows) if self._sync() else set()
+
+    def _grow(self):
+        # 容量不够时把文件扩大一倍：先写新文件再替换
+        capacity = len(self._ids) * 2
+        for name, array in (("ids", self._ids), ("terms", self._terms), ("weights", self._weights)):
+            grown = np.lib.format.open_memmap(
+                self._path(name + ".tmp"), mode="w+", dtype=array.dtype, shape=(capacity,) + array.shape[1:]
+            )
+            grown[:len(array)] = array
+            grown[len(array):] = -1 if name == "ids" else (DIM if name == "terms" else 0)
+            grown.flush()
+            del grown
+        self._df.flush()
+        self._meta.flush()
+        self._replace_files(("ids", "terms", "weights"))
+        self._sync()
+
+    def _vectorize(self, terms: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # 计算TF-IDF权重，只保留权重最高的词，并做L2归一化，这样点积就是余弦相似度
+        article_count = max(len(self._rows), 1)
+        weights = (1 + np.log(counts)) * (np.log((1 + article_count) / (1 + self._df[terms])) + 1)
+        if len(terms) > TERMS_PER_ARTICLE:
+            top = np.argpartition(-weights, TERMS_PER_ARTICLE)[:TERMS_PER_ARTICLE]
+            terms, weights = terms[top], weights[top]
+        norm = np.linalg.norm(weights)
+        if norm > 0:
+            weights = weights / norm
+        return terms, weights
+
+    def _write_row(self, row: int, article_id: int, terms: np.ndarray, weights: np.ndarray):
+        self._ids[row] = article_id
+        self._terms[row] = DIM
+        self._weights[row] = 0
+        self._terms[row, :len(terms)] = terms
+        self._weights[row, :len(weights)] = weights
+
+    def rebuild(self, articles: Iterable[Tuple[int, str]]):
+        """根据所有文章重新生成索引，articles是(文章ID, 文本)的序列"""
+        counted = [(article_id,) + term_counts(text) for article_id, text in articles]
+        with self._locked(exclusive=True):
+            # 写到临时文件后整体替换，其他进程正在映射的旧文件不受影响
+            version = int(self._meta[0]) if self._sync() else 0  # 版本号接着旧索引往上加
+            self._ids, self._terms, self._weights, self._df, self._meta = self._create_files(
+                max(INITIAL_CAPACITY, len(counted)), ".tmp"
+            )
+            self._meta[0] = version
+            for _, terms, _ in counted:  # 先统计所有文章的词频，再计算权重
+                self._df[terms] += 1
+            self._rows = {article_id: row for row, (article_id, _, _) in enumerate(counted)}
+            for row, (article_id, terms, counts) in enumerate(counted):
+                self._write_row(row, article_id, *self._vectorize(terms, counts))
+            self._commit()
+            self._replace_files(("ids", "terms", "weights", "df", "meta"))
+            self._sync()
+
+    def update(self, article_id: int, text: str, old_text: Optional[str] = None):
+        """新增或修改文章时更新它所在的行，old_text是修改前的文本，用于修正词频
+
+        索引文件不存在时什么也不做，由服务启动时根据数据库中的全部文章生成，
+        否则只包含这一篇文章的索引会被当成完整的索引。
+        """
+        terms, counts = term_counts(text)
+        with self._locked(exclusive=True):
+            if not self._sync():
+                return
+            if old_text is not None and article_id in self._rows:
+                self._df[term_counts(old_text)[0]] -= 1
+            self._df[terms] += 1
+            row = self._rows.get(article_id)
+            if row is None:  # 新文章优先复用空行，没有空行时追加到末尾
+                if self._free:
+                    row = self._free.pop()
+                else:
+                    if self._size == len(self._ids):
+                        self._grow()
+                    row = self._size
+                    self._size += 1
+                self._rows[article_id] = row
+            self._write_row(row, article_id, *self._vectorize(terms, counts))
+            self._commit()
+
+    def remove(self, article_id: int, text: Optional[str] = None):
+        """删除文章时清空它所在的行，text是文章的文本，用于修正词频"""
+        with self._locked(exclusive=True):
+            if not self._sync():
+                return
+            row = self._rows.pop(article_id, None)
+            if row is None:
+                return
+            if text is not None:
+                self._df[term_counts(text)[0]] -= 1
+            self._ids[row] = -1
+            self._terms[row] = DIM
+            self._weights[row] = 0
+            self._free.append(row)
+            self._commit()
+
+    def related(self, article_id: int, k: int = 5) -> List[Tuple[int, float]]:
+        """找出和指定文章最相似的k篇文章，返回(文章ID, 相似度)列表"""
+        with self._locked(exclusive=False):
+            if not self._sync():
+                return []
+            row = self._rows.get(article_id)
+            if row is None:
+                return []
+            # 把这篇文章的向量展开成稠密向量（多一位给空位用），和所有行一次性做点积
+            query = np.zeros(DIM + 1, dtype=np.float32)
+            query[self._terms[row]] = self._weights[row]
+            query[DIM] = 0
+            scores = np.einsum("ij,ij->i", query[self._terms[:self._size]], self._weights[:self._size])
+            scores[row] = 0
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k] if k > 0 else np.array([], dtype=np.int64)
+            top = top[np.argsort(-scores[top])]
+            return [(int(self._ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+
+related_index = RelatedIndex()  # 整个应用共用的相关文章索引
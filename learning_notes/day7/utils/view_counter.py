@@ -0,0 +1,155 @@
+# 阅读数统计工具：阅读时只在内存中计数，后台线程定期把增量批量写入数据库
+import heapq
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+from database import engine
+from models.article_view import ArticleView
+
+FLUSH_INTERVAL = 5.0  # 写入数据库的间隔秒数，进程崩溃时最多丢失这段时间内的阅读数
+MAX_PENDING = 10000  # 未写入的阅读次数达到这个值时提前写入
+TOP_N = 50  # 预先计算的排行榜长度
+TRENDING_HALF_LIFE = 6 * 3600.0  # 热度的半衰期秒数，6小时前的一次阅读只算半次
+
+
+class ViewCounter:
+    """内存中的阅读数聚合器，维护累计阅读排行和按时间衰减的热度排行
+
+    累计阅读排行在每次写入后从数据库读取，多个worker写入同一个数据库，看到的排行相同，
+    最多比实际晚一个写入间隔。热度排行只在当前进程的内存中计算，多个worker时每个worker只统计自己收到的阅读。
+    """
+
+    def __init__(self, engine, flush_interval: float = FLUSH_INTERVAL):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Counter = Counter()  # 还没有写入数据库的增量
+        self._pending_total = 0  # 还没有写入数据库的阅读次数
+        # 热度用 2^((t - epoch) / 半衰期) 累加，这样不用每次衰减所有文章，比较大小时结果一样
+        self._trending: Dict[int, float] = {}
+        self._epoch = time.time()
+        self._most_read: List[Tuple[int, int]] = []  # 从数据库读取的累计阅读排行
+        self._hottest: List[Tuple[int, float]] = []  # 预先计算好的热度排行
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self):
+        """从数据库读取累计阅读排行"""
+        self._rebuild_rankings()
+
+    def record(self, article_id: int):
+        """记录一次阅读，只修改内存"""
+        now = time.time()
+        with self._lock:
+            self._pending[article_id] += 1
+            self._pending_total += 1
+            exponent = (now - self._epoch) / TRENDING_HALF_LIFE
+            if exponent > 512:  # 指数太大时整体缩小，避免浮点数溢出
+                self._rescale(now)
+                exponent = 0.0
+            self._trending[article_id] = self._trending.get(article_id, 0.0) + 2.0 ** exponent
+            pending_total = self._pending_total
+        if pending_total >= MAX_PENDING:
+            self._wakeup.set()
+
+    def _rescale(self, now: float):
+        factor = 2.0 ** (-(now - self._epoch) / TRENDING_HALF_LIFE)
+        for article_id in self._trending:
+            self._trending[article_id] *= factor
+        self._epoch = now
+
+    def forget(self, article_id: int):
+        """文章被删除时移除它的阅读数"""
+        # 和flush互斥：否则flush取走增量后、写入数据库前删除的记录，会被随后的写入重新插入
+        with self._flush_lock:
+            with self._lock:
+                self._pending_total -= self._pending.pop(article_id, 0)
+                self._trending.pop(article_id, None)
+            with Session(self.engine) as session:
+                session.execute(delete(ArticleView).where(ArticleView.article_id == article_id))
+                session.commit()
+            self._rebuild_rankings()
+
+    def flush(self):
+        """把内存中的增量用一条批量语句写入数据库，并重新读取排行榜"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, Counter()
+                self._pending_total = 0
+            if pending:
+                # 一条 INSERT ... ON CONFLICT DO UPDATE 语句，没有记录时插入，已有记录时累加
+                statement = insert(ArticleView.__table__)
+                statement = statement.on_conflict_do_update(
+                    index_elements=["article_id"],
+                    set_={"views": ArticleView.__table__.c.views + statement.excluded.views},
+                )
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(statement, [
+                            {"article_id": article_id, "views": views}
+                            for article_id, views in pending.items()
+                        ])
+                except Exception:
+                    # 写入失败时把增量放回去，下次再写
+                    with self._lock:
+                        self._pending.update(pending)
+                        self._pending_total += sum(pending.values())
+                    raise
+            self._rebuild_rankings()
+
+    def _rebuild_rankings(self):
+        # 累计阅读排行以数据库为准，包含其他worker写入的阅读数
+        with Session(self.engine) as session:
+            most_read = session.exec(
+                select(ArticleView.article_id, ArticleView.views)
+                .order_by(ArticleView.views.desc(), ArticleView.article_id)
+                .limit(TOP_N)
+            ).all()
+        with self._lock:
+            hottest = heapq.nlargest(TOP_N, self._trending.items(), key=lambda item: item[1])
+            epoch = self._epoch
+        decay = 2.0 ** (-(time.time() - epoch) / TRENDING_HALF_LIFE)
+        self._most_read = [(article_id, views) for article_id, views in most_read]
+        self._hottest = [(article_id, score * decay) for article_id, score in hottest]
+
+    def popular(self, limit: int = TOP_N) -> List[Tuple[int, int]]:
+        """累计阅读数最多的文章，返回(文章ID, 阅读数)列表"""
+        return self._most_read[:limit]
+
+    def trending(self, limit: int = TOP_N) -> List[Tuple[int, float]]:
+        """最近最热的文章，返回(文章ID, 热度)列表"""
+        return self._hottest[:limit]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:  # 后台线程不能因为一次写入失败就退出
+                print(f"阅读数写入失败: {exc}")
+
+    def start(self):
+        """读取已有阅读数并启动后台写入线程"""
+        self.load()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台线程，并把剩余的增量写入数据库"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+view_counter = ViewCounter(engine)  # 整个应用共用的阅读数聚合器